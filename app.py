@@ -2,50 +2,104 @@
 Flask Web Application for AI Traffic Management System
 """
 
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
-from werkzeug.utils import secure_filename
 import os
+
+# Directions are processed in parallel, so split the CPU threads between them
+# to avoid oversubscription. OpenMP/MKL read these when numpy/torch are imported.
+PARALLEL_DIRECTIONS = 4
+THREADS_PER_DIRECTION = max(1, (os.cpu_count() or 1) // PARALLEL_DIRECTIONS)
+os.environ.setdefault('OMP_NUM_THREADS', str(THREADS_PER_DIRECTION))
+os.environ.setdefault('MKL_NUM_THREADS', str(THREADS_PER_DIRECTION))
+
+from flask import Flask, Request, render_template, request, jsonify, session, redirect, url_for, send_from_directory, abort
+from werkzeug.utils import secure_filename
+import tempfile
+from io import BytesIO
 import uuid
 import json
+from functools import lru_cache
 from pathlib import Path
 import shutil
+import threading
+import time
 import cv2
-import base64
+import torch
+from concurrent.futures import ThreadPoolExecutor
 
-from web_processor import WebTrafficProcessor
+from web_processor import ModelPool
+from results_store import create_results_store
+import config
 
-app = Flask(__name__)
-app.secret_key = os.urandom(24)  # Change this to a fixed secret in production
+# Per-worker thread pools for OpenCV, PyTorch and ONNX Runtime sessions
+cv2.setNumThreads(THREADS_PER_DIRECTION)
+torch.set_num_threads(THREADS_PER_DIRECTION)
+config.INFERENCE_THREADS = THREADS_PER_DIRECTION
+
+# Loaded YOLO models are reused across requests instead of being loaded per simulation;
+# a video simulation uses one model per direction processed in parallel
+model_pool = ModelPool()
+model_pool.preload(PARALLEL_DIRECTIONS)
 
 # Configuration
 UPLOAD_FOLDER = Path('uploads')
 RESULTS_FOLDER = Path('uploads/results')
-ALLOWED_VIDEO_EXTENSIONS = {'mp4', 'avi', 'mov', 'mkv'}
-ALLOWED_IMAGE_EXTENSIONS = {'jpg', 'jpeg', 'png', 'bmp'}
+UPLOAD_TMP_FOLDER = Path('uploads/tmp')
+ALLOWED_VIDEO_EXTENSIONS = frozenset({'mp4', 'avi', 'mov', 'mkv'})
+ALLOWED_IMAGE_EXTENSIONS = frozenset({'jpg', 'jpeg', 'png', 'bmp'})
+# Extension -> upload type, so each upload needs a single lookup
+ALLOWED_EXTENSION_TYPES = {
+    **{ext: 'video' for ext in ALLOWED_VIDEO_EXTENSIONS},
+    **{ext: 'image' for ext in ALLOWED_IMAGE_EXTENSIONS}
+}
 MAX_FILE_SIZE = 500 * 1024 * 1024  # 500MB
+MAX_IN_MEMORY_UPLOAD = 500 * 1024  # Smaller uploads are buffered in memory
+SESSION_MAX_AGE = 3600  # Remove session uploads older than 1 hour
+SESSION_CLEANUP_INTERVAL = 600  # Run session cleanup every 10 minutes
+RESULT_IMAGE_MAX_AGE = 3600  # Browser cache lifetime for result images (seconds)
+
+
+class UploadRequest(Request):
+    """
+    Request that spools large uploads inside the uploads folder
+    so they can be linked into place instead of copied
+    """
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if total_content_length is not None and total_content_length <= MAX_IN_MEMORY_UPLOAD:
+            return BytesIO()
+        return tempfile.NamedTemporaryFile('wb+', dir=UPLOAD_TMP_FOLDER)
+
+
+app = Flask(__name__)
+app.request_class = UploadRequest
+app.secret_key = os.urandom(24)  # Change this to a fixed secret in production
 
 # Create directories
 UPLOAD_FOLDER.mkdir(exist_ok=True)
 RESULTS_FOLDER.mkdir(exist_ok=True)
+UPLOAD_TMP_FOLDER.mkdir(exist_ok=True)
 
 app.config['UPLOAD_FOLDER'] = str(UPLOAD_FOLDER)
 app.config['RESULTS_FOLDER'] = str(RESULTS_FOLDER)
 app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
 
+# Results live server-side; the session cookie only carries their ID
+results_store = create_results_store()
 
-def allowed_file(filename, file_type='video'):
-    """Check if file extension is allowed"""
-    if '.' not in filename:
-        return False
-    
-    ext = filename.rsplit('.', 1)[1].lower()
-    
-    if file_type == 'video':
-        return ext in ALLOWED_VIDEO_EXTENSIONS
-    elif file_type == 'image':
-        return ext in ALLOWED_IMAGE_EXTENSIONS
-    else:
-        return ext in ALLOWED_VIDEO_EXTENSIONS or ext in ALLOWED_IMAGE_EXTENSIONS
+# Annotated images are JPEG-encoded in the background so /process can return early
+image_writer = ThreadPoolExecutor(max_workers=os.cpu_count() or 1)
+_pending_images = {}
+_pending_images_lock = threading.Lock()
+
+# Folders already created by this process (avoids a mkdir per upload)
+_created_folders = set()
+_created_folders_lock = threading.Lock()
+
+
+@lru_cache(maxsize=1024)
+def cached_secure_filename(filename):
+    """secure_filename() is pure, so repeated upload names are cached"""
+    return secure_filename(filename)
 
 
 def get_session_folder():
@@ -54,14 +108,132 @@ def get_session_folder():
         session['session_id'] = str(uuid.uuid4())
     
     session_folder = UPLOAD_FOLDER / 'sessions' / session['session_id']
-    session_folder.mkdir(parents=True, exist_ok=True)
+    ensure_folder(session_folder)
     
     return session_folder
 
 
+def ensure_folder(folder):
+    """Create a folder the first time it is requested by this process"""
+    with _created_folders_lock:
+        if folder in _created_folders:
+            return
+        folder.mkdir(parents=True, exist_ok=True)
+        _created_folders.add(folder)
+
+
+def forget_folder(folder):
+    """Drop a removed folder (and its subfolders) from the created-folder cache"""
+    with _created_folders_lock:
+        stale = {f for f in _created_folders if f == folder or folder in f.parents}
+        _created_folders.difference_update(stale)
+
+
+def recreate_folder(folder):
+    """Re-create a cached folder that was removed outside this process"""
+    forget_folder(folder)
+    ensure_folder(folder)
+
+
+def save_upload(file, filepath):
+    """
+    Save an uploaded file to its final path
+    
+    Uploads spooled to disk by UploadRequest are hard-linked into place,
+    so the data is written once instead of spooled and then copied.
+    
+    Args:
+        file: Uploaded FileStorage
+        filepath: Destination path
+    """
+    try:
+        _write_upload(file, filepath)
+    except FileNotFoundError:
+        # The cached folder was deleted externally; create it again and retry once
+        recreate_folder(filepath.parent)
+        _write_upload(file, filepath)
+
+
+def _write_upload(file, filepath):
+    """Hard-link or copy an uploaded file to filepath"""
+    spool_path = getattr(file.stream, 'name', None)
+    
+    if isinstance(spool_path, str):
+        try:
+            file.stream.flush()
+            filepath.unlink(missing_ok=True)
+            os.link(spool_path, filepath)
+            return
+        except OSError:
+            pass  # e.g. filesystem without hard links, fall back to copying
+    
+    file.save(filepath)
+
+
+def save_image_async(processor, frame, output_path):
+    """
+    Queue an annotated frame to be written by the background image writer
+    
+    Args:
+        processor: WebTrafficProcessor used to encode the frame
+        frame: Annotated frame
+        output_path: Output image path
+    """
+    key = str(Path(output_path).resolve())
+    future = image_writer.submit(_write_image, processor, frame, Path(output_path))
+    
+    with _pending_images_lock:
+        _pending_images[key] = future
+    
+    def _done(_):
+        with _pending_images_lock:
+            if _pending_images.get(key) is future:
+                del _pending_images[key]
+    
+    future.add_done_callback(_done)
+
+
+def _write_image(processor, frame, output_path):
+    """Write an annotated frame, re-creating its folder if it was deleted externally"""
+    try:
+        processor.save_annotated_frame(frame, str(output_path))
+    except FileNotFoundError:
+        recreate_folder(output_path.parent)
+        processor.save_annotated_frame(frame, str(output_path))
+
+
+def image_path_pending(image_path):
+    """Check whether an image is still queued for writing"""
+    with _pending_images_lock:
+        return str(Path(image_path).resolve()) in _pending_images
+
+
+def wait_for_image(image_path, timeout=30):
+    """
+    Wait until a queued image has been written
+    
+    Args:
+        image_path: Image path
+        timeout: Maximum seconds to wait
+        
+    Returns:
+        bool: True if the image was queued (and is now written or failed)
+    """
+    with _pending_images_lock:
+        future = _pending_images.get(str(Path(image_path).resolve()))
+    
+    if future is None:
+        return False
+    
+    try:
+        future.result(timeout=timeout)
+    except Exception as e:
+        print(f"[WARNING] Failed to write {image_path}: {e}")
+    return True
+
+
 def cleanup_old_sessions():
     """Clean up old session folders (older than 1 hour)"""
-    import time
     sessions_folder = UPLOAD_FOLDER / 'sessions'
     
     if not sessions_folder.exists():
@@ -71,16 +243,28 @@ def cleanup_old_sessions():
     for session_dir in sessions_folder.iterdir():
         if session_dir.is_dir():
             # Check if older than 1 hour
-            if current_time - session_dir.stat().st_mtime > 3600:
+            if current_time - session_dir.stat().st_mtime > SESSION_MAX_AGE:
+                forget_folder(session_dir)
                 shutil.rmtree(session_dir, ignore_errors=True)
 
 
+def schedule_session_cleanup():
+    """Clean up old sessions now and again every SESSION_CLEANUP_INTERVAL seconds"""
+    try:
+        cleanup_old_sessions()
+    finally:
+        timer = threading.Timer(SESSION_CLEANUP_INTERVAL, schedule_session_cleanup)
+        timer.daemon = True
+        timer.start()
+
+
+# Session cleanup runs in the background instead of on every page load
+schedule_session_cleanup()
+
+
 @app.route('/')
 def index():
     """Main page"""
-    # Cleanup old sessions on page load
-    cleanup_old_sessions()
-    
     # Reset session
     session.pop('session_id', None)
     session.pop('uploaded_files', None)
@@ -107,14 +291,11 @@ def upload_file():
             return jsonify({'error': 'No file selected'}), 400
         
         # Determine file type
-        filename = secure_filename(file.filename)
-        ext = filename.rsplit('.', 1)[1].lower()
+        filename = cached_secure_filename(file.filename)
+        ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+        file_type = ALLOWED_EXTENSION_TYPES.get(ext)
         
-        if ext in ALLOWED_VIDEO_EXTENSIONS:
-            file_type = 'video'
-        elif ext in ALLOWED_IMAGE_EXTENSIONS:
-            file_type = 'image'
-        else:
+        if file_type is None:
             return jsonify({'error': 'Invalid file type. Allowed: video (mp4, avi, mov, mkv) or image (jpg, png)'}), 400
         
         # Check consistency with processing mode
@@ -127,10 +308,10 @@ def upload_file():
         # Save file
         session_folder = get_session_folder()
         direction_folder = session_folder / direction.lower()
-        direction_folder.mkdir(exist_ok=True)
+        ensure_folder(direction_folder)
         
         filepath = direction_folder / filename
-        file.save(filepath)
+        save_upload(file, filepath)
         
         # Track uploaded files
         if 'uploaded_files' not in session:
@@ -161,19 +342,15 @@ def process_simulation():
         uploaded_files = session['uploaded_files']
         processing_mode = session.get('processing_mode', 'video')
         
-        # Initialize processor
-        processor = WebTrafficProcessor()
-        
-        # Process each direction
-        direction_results = {}
-        
-        for direction, filepath in uploaded_files.items():
+        with model_pool.processor() as processor:
             if processing_mode == 'video':
-                result = processor.process_direction_video(filepath, direction)
+                # Process all directions in parallel, with pooled models for the extra directions
+                direction_results = processor.process_all_directions(
+                    uploaded_files, pool=model_pool, max_workers=PARALLEL_DIRECTIONS
+                )
             else:
-                result = processor.process_direction_image(filepath, direction)
-            
-            direction_results[direction] = result
+                # All images go through the model in a single batch
+                direction_results = processor.process_directions_batch(uploaded_files)
         
         # Aggregate results
         aggregated = processor.aggregate_results(direction_results)
@@ -189,14 +366,14 @@ def process_simulation():
                 # Save sample frames
                 for idx, frame in enumerate(result.get('sample_frames', [])):
                     output_path = results_folder / f'{direction.lower()}_frame_{idx}.jpg'
-                    processor.save_annotated_frame(frame, str(output_path))
+                    save_image_async(processor, frame, output_path)
                     
                     if idx == 0:  # Use first frame as representative
                         processed_images[direction] = str(output_path)
             else:
                 # Save annotated image
                 output_path = results_folder / f'{direction.lower()}_annotated.jpg'
-                processor.save_annotated_frame(result['annotated_frame'], str(output_path))
+                save_image_async(processor, result['annotated_frame'], output_path)
                 processed_images[direction] = str(output_path)
         
         # Prepare results for display
@@ -221,9 +398,14 @@ def process_simulation():
                     'density_level': result['density_level']
                 }
         
-        # Save results to session
-        session['results'] = results_data
-        session.modified = True
+        # Save results server-side and keep only the ID in the session
+        results_id = str(uuid.uuid4())
+        results_store.set(results_id, results_data)
+        
+        old_results_id = session.get('results_id')
+        if old_results_id:
+            results_store.delete(old_results_id)
+        session['results_id'] = results_id
         
         return jsonify({
             'success': True,
@@ -236,25 +418,88 @@ def process_simulation():
         return jsonify({'error': str(e)}), 500
 
 
+def get_current_results():
+    """
+    Get the current session's results with image URLs attached
+    
+    Returns:
+        dict or None: Results data, or None if there are no results
+    """
+    results_id = session.get('results_id')
+    results_data = results_store.get(results_id) if results_id else None
+    
+    if results_data is None:
+        return None
+    
+    results_data = dict(results_data)
+    
+    # Link images so the browser fetches (and caches) them directly;
+    # images still being written are served once ready.
+    # The results ID busts the cache when a session is re-processed.
+    image_urls = {}
+    for direction, image_path in results_data['processed_images'].items():
+        if os.path.exists(image_path) or image_path_pending(image_path):
+            image_urls[direction] = url_for('result_image', filename=Path(image_path).name, v=results_id)
+    
+    results_data['image_urls'] = image_urls
+    
+    return results_data
+
+
 @app.route('/results')
 def results():
     """Display results page"""
-    if 'results' not in session:
+    results_data = get_current_results()
+    
+    if results_data is None:
         return redirect(url_for('index'))
     
-    results_data = session['results']
+    return render_template('results.html', results=results_data)
+
+
+@app.route('/api/results')
+def api_results():
+    """Get results as JSON (images are referenced by URL)"""
+    results_data = get_current_results()
+    
+    if results_data is None:
+        return jsonify({'error': 'No results available'}), 404
     
-    # Convert images to base64 for display
-    images_base64 = {}
-    for direction, image_path in results_data['processed_images'].items():
-        if os.path.exists(image_path):
-            with open(image_path, 'rb') as f:
-                img_data = base64.b64encode(f.read()).decode('utf-8')
-                images_base64[direction] = f'data:image/jpeg;base64,{img_data}'
+    # Server-side file paths are not part of the API
+    results_data.pop('processed_images', None)
     
-    results_data['images_base64'] = images_base64
+    return jsonify(results_data)
+
+
+@app.route('/results/images/<path:filename>')
+def result_image(filename):
+    """Serve a processed image belonging to the current session's stored results"""
+    results_id = session.get('results_id')
+    results_data = results_store.get(results_id) if results_id else None
     
-    return render_template('results.html', results=results_data)
+    if results_data is None:
+        abort(404)
+    
+    # Only files saved with these results can be served, wherever the session now points
+    image_path = next(
+        (Path(path) for path in results_data['processed_images'].values() if Path(path).name == filename),
+        None
+    )
+    if image_path is None:
+        abort(404)
+    
+    results_folder = image_path.parent.resolve()
+    wait_for_image(results_folder / filename)
+    
+    # send_file streams via wsgi.file_wrapper (sendfile on most servers) and answers conditional requests
+    response = send_from_directory(
+        results_folder, filename, mimetype='image/jpeg', conditional=True, max_age=RESULT_IMAGE_MAX_AGE
+    )
+    # Images belong to one session, so only the browser may cache them
+    response.cache_control.public = False
+    response.cache_control.private = True
+    
+    return response
 
 
 @app.route('/reset', methods=['POST'])
@@ -263,6 +508,7 @@ def reset():
     # Cleanup session folder
     if 'session_id' in session:
         session_folder = UPLOAD_FOLDER / 'sessions' / session['session_id']
+        forget_folder(session_folder)
         if session_folder.exists():
             shutil.rmtree(session_folder, ignore_errors=True)
         
@@ -270,6 +516,10 @@ def reset():
         if results_folder.exists():
             shutil.rmtree(results_folder, ignore_errors=True)
     
+    # Drop stored results
+    if 'results_id' in session:
+        results_store.delete(session['results_id'])
+    
     # Clear session
     session.clear()
     
@@ -3,8 +3,11 @@ Quick script to download 4 sample traffic images for testing
 These are public domain/free images from direct URLs
 """
 
-import urllib.request
 import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
 
 # Create sample_images directory
 output_dir = "sample_images"
@@ -18,28 +21,50 @@ images = {
     "west_critical_traffic.jpg": "https://images.pexels.com/photos/2116715/pexels-photo-2116715.jpeg?auto=compress&cs=tinysrgb&w=800"
 }
 
+
+def download_image(http, filename, url):
+    """Stream one image to disk and return its path"""
+    filepath = os.path.join(output_dir, filename)
+    
+    with http.get(url, stream=True, timeout=30) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True
+        with open(filepath, 'wb') as f:
+            shutil.copyfileobj(response.raw, f, length=1 << 16)
+    
+    return filepath
+
+
 print("=" * 60)
 print("DOWNLOADING 4 SAMPLE TRAFFIC IMAGES")
 print("=" * 60)
 print()
 
 for filename, url in images.items():
-    try:
-        filepath = os.path.join(output_dir, filename)
-        print(f"📥 Downloading: {filename}")
-        print(f"   URL: {url[:60]}...")
-        
-        # Download the image
-        urllib.request.urlretrieve(url, filepath)
-        
-        # Check file size
-        size_kb = os.path.getsize(filepath) / 1024
-        print(f"   ✓ Saved: {filepath} ({size_kb:.1f} KB)")
-        print()
-        
-    except Exception as e:
-        print(f"   ✗ Error downloading {filename}: {str(e)}")
-        print()
+    print(f"📥 Downloading: {filename}")
+    print(f"   URL: {url[:60]}...")
+print()
+
+# Download all images concurrently over a shared keep-alive session
+with requests.Session() as http, ThreadPoolExecutor(max_workers=len(images)) as executor:
+    futures = {
+        executor.submit(download_image, http, filename, url): filename
+        for filename, url in images.items()
+    }
+    
+    for future in as_completed(futures):
+        filename = futures[future]
+        try:
+            filepath = future.result()
+            
+            # Check file size
+            size_kb = os.path.getsize(filepath) / 1024
+            print(f"   ✓ Saved: {filepath} ({size_kb:.1f} KB)")
+            
+        except Exception as e:
+            print(f"   ✗ Error downloading {filename}: {str(e)}")
+
+print()
 
 print("=" * 60)
 print("DOWNLOAD COMPLETE!")
@@ -5,6 +5,11 @@ Integrates all modules for real-time traffic control
 
 import cv2
 import argparse
+import logging
+from logging.handlers import RotatingFileHandler
+import os
+import queue
+import threading
 import time
 from pathlib import Path
 import sys
@@ -17,8 +22,41 @@ from vehicle_detector import VehicleDetector
 from traffic_analyzer import TrafficAnalyzer
 from signal_controller import TrafficSignalController
 from visualizer import TrafficVisualizer
+from video_capture import open_video_capture
 import config
 
+logger = logging.getLogger('traffic')
+
+# Marks the end of the frame stream between pipeline stages
+_END_OF_STREAM = object()
+
+
+def setup_logging(verbose=False):
+    """
+    Configure the 'traffic' logger
+    
+    Status lines always go to the rotating log file, and also
+    to the console when verbose is set.
+    
+    Args:
+        verbose: Whether to echo log messages to the console
+    """
+    logger.setLevel(config.LOG_LEVEL)
+    formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(message)s')
+    
+    file_handler = RotatingFileHandler(
+        os.path.join(config.BASE_DIR, config.LOG_FILE),
+        maxBytes=5 * 1024 * 1024,
+        backupCount=3
+    )
+    file_handler.setFormatter(formatter)
+    logger.addHandler(file_handler)
+    
+    if verbose:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(formatter)
+        logger.addHandler(console_handler)
+
 
 class TrafficManagementSystem:
     """
@@ -45,7 +83,9 @@ class TrafficManagementSystem:
         
         # Initialize video capture
         print(f"\n[INFO] Opening video source: {video_source}")
-        self.cap = cv2.VideoCapture(video_source)
+        # Detection-sized frames (longer side = IMG_SIZE, aspect ratio kept)
+        # are decoded directly when the decoder can resize
+        self.cap = open_video_capture(video_source, decode_max_side=config.IMG_SIZE)
         
         if not self.cap.isOpened():
             raise ValueError(f"Cannot open video source: {video_source}")
@@ -66,6 +106,12 @@ class TrafficManagementSystem:
         if self.display:
             self.visualizer = TrafficVisualizer()
         
+        # OpenCL (T-API) for display resizing
+        self.use_opencl = config.USE_OPENCL and cv2.ocl.haveOpenCL()
+        if self.use_opencl:
+            cv2.ocl.setUseOpenCL(True)
+            print("[INFO] OpenCL enabled for visualization")
+        
         # Output video writer
         self.video_writer = None
         if self.save_output:
@@ -85,6 +131,20 @@ class TrafficManagementSystem:
         self.start_time = time.time()
         self.total_vehicles_detected = 0
         
+        # Latest status, published by the frame loop and logged by a background thread
+        self._status = None
+        self._status_lock = threading.Lock()
+        self._stop_status = threading.Event()
+        self._status_thread = None
+        if config.ENABLE_STATS:
+            self._status_thread = threading.Thread(target=self._report_status, daemon=True)
+        
+        # Pipeline control (decoder and inference threads)
+        self._stop_pipeline = threading.Event()
+        self._resume = threading.Event()
+        self._resume.set()
+        self._controller_lock = threading.Lock()
+        
         print("\n[SUCCESS] System initialized successfully!")
         print("="*60)
         print("\nControls:")
@@ -93,82 +153,67 @@ class TrafficManagementSystem:
         print("  Press 'p' to pause")
         print("="*60)
     
+    def _report_status(self):
+        """Log the latest status every STATS_UPDATE_INTERVAL seconds"""
+        last_reported = None
+        
+        while not self._stop_status.wait(config.STATS_UPDATE_INTERVAL):
+            with self._status_lock:
+                status = self._status
+            
+            if status is None or status is last_reported:
+                continue
+            last_reported = status
+            
+            frame_count, fps, vehicles, direction, phase = status
+            runtime = time.time() - self.start_time
+            logger.info(
+                "[Frame %d] FPS: %.1f | Vehicles: %d | Signal: %s (%s) | Runtime: %.1fs",
+                frame_count, fps, vehicles, direction, phase, runtime
+            )
+    
     def run(self):
-        """Main processing loop"""
+        """
+        Main processing loop
+        
+        Decoding and inference run on their own threads, connected by small
+        bounded queues, so each frame costs max(decode, infer, visualize)
+        instead of their sum. Display and key handling stay on the main thread.
+        Errors raised on the pipeline threads are re-raised here once they stop.
+        """
         paused = False
-        frame_skip_counter = 0
+        error = None
+        
+        if self._status_thread:
+            self._status_thread.start()
+        
+        frame_queue = queue.Queue(maxsize=config.PIPELINE_QUEUE_SIZE)
+        result_queue = queue.Queue(maxsize=config.PIPELINE_QUEUE_SIZE)
+        
+        decoder = threading.Thread(target=self._decode_frames, args=(frame_queue,), daemon=True)
+        inference = threading.Thread(target=self._infer_frames, args=(frame_queue, result_queue), daemon=True)
+        decoder.start()
+        inference.start()
         
         try:
             while True:
-                if not paused:
-                    # Read frame
-                    ret, frame = self.cap.read()
-                    
-                    if not ret:
-                        print("\n[INFO] End of video or cannot read frame")
-                        break
-                    
-                    self.frame_count += 1
-                    
-                    # Frame skipping for better CPU performance
-                    frame_skip_counter += 1
-                    if frame_skip_counter % config.PROCESS_EVERY_N_FRAMES != 0:
-                        continue
-                    
-                    # Detect vehicles
-                    detections = self.detector.detect_vehicles(frame)
-                    self.total_vehicles_detected += len(detections)
-                    
-                    # Analyze traffic
-                    traffic_analysis = self.analyzer.analyze_traffic(detections)
-                    
-                    # Update signal controller
-                    signal_status = self.controller.update(traffic_analysis)
-                    
-                    # Get statistics
-                    detector_stats = self.detector.get_stats()
-                    
-                    stats = {
-                        'fps': detector_stats['fps'],
-                        'total_vehicles': len(detections),
-                        'active_tracks': detector_stats['active_tracks'],
-                        'frame_count': self.frame_count
-                    }
-                    
-                    # Visualize
-                    if self.display:
-                        # Draw detections and zones on frame
-                        display_frame = frame.copy()
-                        display_frame = self.visualizer.draw_detections_and_zones(
-                            display_frame, detections, traffic_analysis
-                        )
-                        
-                        # Create full visualization
-                        viz_frame = self.visualizer.create_frame(
-                            display_frame, detections, traffic_analysis, 
-                            signal_status, stats
-                        )
-                        
-                        # Show
-                        self.visualizer.show(viz_frame)
-                        
-                        # Save if requested
-                        if self.video_writer:
-                            self.video_writer.write(viz_frame)
-                    
-                    # Cleanup old tracks periodically
-                    if self.frame_count % 30 == 0:
-                        self.detector.cleanup_tracks()
-                    
-                    # Print status to console periodically
-                    if self.frame_count % 30 == 0:
-                        runtime = time.time() - self.start_time
-                        print(f"\r[Frame {self.frame_count}] "
-                              f"FPS: {stats['fps']:.1f} | "
-                              f"Vehicles: {stats['total_vehicles']} | "
-                              f"Signal: {signal_status['active_direction']} ({signal_status['phase']}) | "
-                              f"Runtime: {runtime:.1f}s", 
-                              end='', flush=True)
+                # Wait briefly for the next processed frame, keeping the UI responsive
+                try:
+                    item = result_queue.get(timeout=0.001 if self.display else 0.1)
+                except queue.Empty:
+                    item = None
+                
+                if isinstance(item, Exception):
+                    error = item  # A pipeline stage failed
+                    break
+                
+                if item is _END_OF_STREAM:
+                    print("\n[INFO] End of video or cannot read frame")
+                    break
+                
+                # Visualize
+                if item is not None and self.display:
+                    self._visualize(*item)
                 
                 # Handle key press
                 if self.display:
@@ -179,25 +224,200 @@ class TrafficManagementSystem:
                         break
                     elif key == ord('s'):
                         print("\n[INFO] Skipping to next signal...")
-                        self.controller.force_next_signal()
+                        with self._controller_lock:
+                            self.controller.force_next_signal()
                     elif key == ord('p'):
                         paused = not paused
+                        if paused:
+                            self._resume.clear()
+                        else:
+                            self._resume.set()
                         status = "PAUSED" if paused else "RESUMED"
                         print(f"\n[INFO] {status}")
-                else:
-                    # No display, just a small delay
-                    time.sleep(0.01)
         
         except KeyboardInterrupt:
             print("\n\n[INFO] Interrupted by user")
         
         finally:
+            # Stop the pipeline threads before releasing the capture they read from
+            self._stop_pipeline.set()
+            self._resume.set()
+            decoder.join()
+            inference.join()
             self.cleanup()
+        
+        if error is not None:
+            raise error
+    
+    def _decode_frames(self, frame_queue):
+        """
+        Pipeline stage 1: grab every frame, decode every Nth one
+        
+        Args:
+            frame_queue: Queue receiving (frame_count, frame) items, then the
+                         end marker (or the exception that stopped decoding)
+        """
+        frame_skip_counter = 0
+        end = _END_OF_STREAM
+        
+        try:
+            while not self._stop_pipeline.is_set():
+                # Hold while paused
+                if not self._resume.wait(0.1):
+                    continue
+                
+                # Grab frame (advances the stream without decoding)
+                if not self.cap.grab():
+                    break
+                
+                self.frame_count += 1
+                
+                # Frame skipping for better CPU performance
+                frame_skip_counter += 1
+                if frame_skip_counter % config.PROCESS_EVERY_N_FRAMES != 0:
+                    continue
+                
+                # Decode only the frames we actually process
+                ret, frame = self.cap.retrieve()
+                
+                if not ret:
+                    break
+                
+                if not self._put(frame_queue, (self.frame_count, frame)):
+                    break
+        except Exception as e:
+            end = e  # Passed down the pipeline and re-raised by run()
+        finally:
+            self._put(frame_queue, end)
+    
+    def _infer_frames(self, frame_queue, result_queue):
+        """
+        Pipeline stage 2: detection, traffic analysis and signal control
+        
+        Args:
+            frame_queue: Queue of (frame_count, frame) items from the decoder
+            result_queue: Queue receiving results for visualization, then the
+                          end marker (or the exception that stopped the pipeline)
+        """
+        end = _END_OF_STREAM
+        
+        try:
+            while True:
+                item = self._get(frame_queue)
+                if item is _END_OF_STREAM or isinstance(item, Exception):
+                    end = item  # Forward a decoder error as is
+                    break
+                
+                frame_count, frame = item
+                
+                # Detect vehicles
+                detections = self.detector.detect_vehicles(frame)
+                self.total_vehicles_detected += len(detections)
+                
+                # Analyze traffic
+                traffic_analysis = self.analyzer.analyze_traffic(detections)
+                
+                # Update signal controller
+                with self._controller_lock:
+                    signal_status = self.controller.update(traffic_analysis)
+                
+                # Get statistics
+                detector_stats = self.detector.get_stats()
+                
+                stats = {
+                    'fps': detector_stats['fps'],
+                    'total_vehicles': len(detections),
+                    'active_tracks': detector_stats['active_tracks'],
+                    'frame_count': frame_count
+                }
+                
+                # Cleanup old tracks periodically
+                if frame_count % 30 == 0:
+                    self.detector.cleanup_tracks()
+                
+                # Publish status for the status thread (formatted and logged off the hot path)
+                status = (
+                    frame_count, stats['fps'], stats['total_vehicles'],
+                    signal_status['active_direction'], signal_status['phase']
+                )
+                with self._status_lock:
+                    self._status = status
+                
+                if not self._put(result_queue, (frame, detections, traffic_analysis, signal_status, stats)):
+                    break
+        except Exception as e:
+            end = e  # Re-raised by run()
+        finally:
+            self._put(result_queue, end)
+    
+    def _visualize(self, frame, detections, traffic_analysis, signal_status, stats):
+        """
+        Pipeline stage 3: draw, show and save a processed frame
+        
+        Args:
+            frame: Processed video frame
+            detections: Vehicle detections
+            traffic_analysis: Traffic analysis results
+            signal_status: Signal controller status
+            stats: System statistics
+        """
+        # Draw detections and zones on frame (in place, raw frame is not needed afterwards)
+        display_frame = self.visualizer.draw_detections_and_zones(
+            frame, detections, traffic_analysis
+        )
+        
+        # Upload once so the display resize runs on the OpenCL device
+        if self.use_opencl:
+            display_frame = cv2.UMat(display_frame)
+        
+        # Create full visualization
+        viz_frame = self.visualizer.create_frame(
+            display_frame, detections, traffic_analysis, 
+            signal_status, stats
+        )
+        
+        # Show
+        self.visualizer.show(viz_frame)
+        
+        # Save if requested
+        if self.video_writer:
+            self.video_writer.write(viz_frame)
+    
+    def _put(self, q, item):
+        """
+        Put an item on a pipeline queue, giving up once the pipeline is stopped
+        
+        Returns:
+            bool: True if the item was queued
+        """
+        while not self._stop_pipeline.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def _get(self, q):
+        """
+        Get an item from a pipeline queue, or the end marker once the pipeline is stopped
+        """
+        while not self._stop_pipeline.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _END_OF_STREAM
     
     def cleanup(self):
         """Clean up resources"""
         print("\n\n[INFO] Cleaning up...")
         
+        # Stop status reporting
+        self._stop_status.set()
+        if self._status_thread and self._status_thread.is_alive():
+            self._status_thread.join()
+        
         # Print final statistics
         runtime = time.time() - self.start_time
         avg_fps = self.frame_count / runtime if runtime > 0 else 0
@@ -243,9 +463,25 @@ def main():
         action='store_true',
         help='Save output video'
     )
+    parser.add_argument(
+        '--verbose', '-v',
+        action='store_true',
+        help='Print periodic status logs to the console'
+    )
+    parser.add_argument(
+        '--imgsz',
+        type=int,
+        default=config.IMG_SIZE,
+        help=f'YOLO inference size in pixels (default: {config.IMG_SIZE})'
+    )
     
     args = parser.parse_args()
     
+    # Inference size is read from config by the detector
+    config.IMG_SIZE = args.imgsz
+    
+    setup_logging(verbose=args.verbose)
+    
     # Convert input to int if it's a number (camera index)
     video_source = args.input
     try:
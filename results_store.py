@@ -0,0 +1,124 @@
+"""
+Results Storage Module
+Keeps simulation results server-side instead of in the session cookie
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+
+RESULTS_TTL = 3600  # Keep results for 1 hour
+
+
+class MemoryResultsStore:
+    """
+    In-process results store with expiry
+    Results are only visible to the worker process that stored them
+    """
+    
+    def __init__(self, ttl: int = RESULTS_TTL):
+        """
+        Initialize the store
+        
+        Args:
+            ttl: Seconds before stored results expire
+        """
+        self.ttl = ttl
+        self._items = {}
+        self._lock = threading.Lock()
+    
+    def set(self, results_id: str, results_data: Dict):
+        """Store results under an ID"""
+        with self._lock:
+            self._purge_expired()
+            self._items[results_id] = (time.time() + self.ttl, results_data)
+    
+    def get(self, results_id: str) -> Optional[Dict]:
+        """Get results by ID, or None if missing or expired"""
+        with self._lock:
+            item = self._items.get(results_id)
+            if item is None:
+                return None
+            expires_at, results_data = item
+            if expires_at < time.time():
+                del self._items[results_id]
+                return None
+            return results_data
+    
+    def delete(self, results_id: str):
+        """Remove results by ID"""
+        with self._lock:
+            self._items.pop(results_id, None)
+    
+    def _purge_expired(self):
+        """Drop expired entries (caller holds the lock)"""
+        now = time.time()
+        expired = [key for key, (expires_at, _) in self._items.items() if expires_at < now]
+        for key in expired:
+            del self._items[key]
+
+
+class RedisResultsStore:
+    """
+    Redis-backed results store
+    Shared by all worker processes; entries expire via SETEX
+    """
+    
+    def __init__(self, redis_url: str, ttl: int = RESULTS_TTL):
+        """
+        Initialize the store
+        
+        Args:
+            redis_url: Redis connection URL (e.g. redis://localhost:6379/0)
+            ttl: Seconds before stored results expire
+        """
+        import redis
+        
+        self.ttl = ttl
+        self.client = redis.Redis.from_url(redis_url)
+    
+    def set(self, results_id: str, results_data: Dict):
+        """Store results under an ID"""
+        self.client.setex(self._key(results_id), self.ttl, json.dumps(results_data))
+    
+    def get(self, results_id: str) -> Optional[Dict]:
+        """Get results by ID, or None if missing or expired"""
+        data = self.client.get(self._key(results_id))
+        return json.loads(data) if data is not None else None
+    
+    def delete(self, results_id: str):
+        """Remove results by ID"""
+        self.client.delete(self._key(results_id))
+    
+    @staticmethod
+    def _key(results_id: str) -> str:
+        return f"results:{results_id}"
+
+
+def create_results_store():
+    """
+    Create the results store for the web app
+    
+    Uses Redis when REDIS_URL is set and the redis package is installed,
+    otherwise falls back to an in-memory store.
+    
+    Returns:
+        MemoryResultsStore or RedisResultsStore
+    """
+    redis_url = os.environ.get('REDIS_URL')
+    
+    if redis_url:
+        try:
+            store = RedisResultsStore(redis_url)
+            store.client.ping()
+            print(f"[INFO] Storing results in Redis: {redis_url}")
+            return store
+        except ImportError:
+            print("[WARNING] REDIS_URL is set but redis is not installed (pip install redis)")
+        except Exception as e:
+            print(f"[WARNING] Cannot connect to Redis ({e}), using in-memory results store")
+    
+    return MemoryResultsStore()
@@ -0,0 +1,125 @@
+"""
+ONNX Runtime Inference Module
+Runs exported YOLOv8 ONNX models directly on ONNX Runtime
+"""
+
+import ast
+import cv2
+import numpy as np
+import os
+from pathlib import Path
+import sys
+
+import onnxruntime as ort
+import torch
+from ultralytics.engine.results import Results
+from ultralytics.utils import ops
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent))
+import config
+
+
+class ONNXYOLOModel:
+    """
+    YOLOv8 predictor backed by an ONNX Runtime session
+    Implements the subset of YOLO.predict() used by VehicleDetector
+    """
+    
+    def __init__(self, onnx_path):
+        """
+        Create the inference session
+        
+        Args:
+            onnx_path: Path to a static-shape YOLOv8 ONNX export
+        """
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = config.INFERENCE_THREADS or os.cpu_count()
+        
+        self.session = ort.InferenceSession(
+            str(onnx_path),
+            sess_options=options,
+            providers=['CPUExecutionProvider']
+        )
+        
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.imgsz = model_input.shape[2]  # Exported with dynamic=False: [1, 3, H, W]
+        
+        # Ultralytics stores the class names in the model metadata
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.names = ast.literal_eval(metadata['names']) if 'names' in metadata else {}
+        
+        # Input tensor reused across frames
+        self._input = np.zeros((1, 3, self.imgsz, self.imgsz), dtype=np.float32)
+        self._padded = np.full((self.imgsz, self.imgsz, 3), 114, dtype=np.uint8)
+    
+    def predict(self, source, conf=0.25, iou=0.45, **kwargs):
+        """
+        Run detection on one frame or a list of frames
+        
+        imgsz, device, half and verbose are accepted for compatibility
+        with YOLO.predict() and ignored (fixed by the export).
+        
+        Args:
+            source: Frame (numpy array) or list of frames
+            conf: Confidence threshold
+            iou: NMS IoU threshold
+        
+        Returns:
+            list: One ultralytics Results object per frame
+        """
+        frames = source if isinstance(source, list) else [source]
+        return [self._predict_frame(frame, conf, iou) for frame in frames]
+    
+    def _predict_frame(self, frame, conf, iou):
+        """
+        Run detection on a single frame
+        
+        Args:
+            frame: Input BGR frame
+            conf: Confidence threshold
+            iou: NMS IoU threshold
+        
+        Returns:
+            Results: Detections scaled back to the frame size
+        """
+        self._preprocess(frame)
+        
+        output = self.session.run(None, {self.input_name: self._input})[0]
+        
+        detections = ops.non_max_suppression(torch.from_numpy(output), conf, iou)[0]
+        detections[:, :4] = ops.scale_boxes(
+            (self.imgsz, self.imgsz), detections[:, :4], frame.shape
+        )
+        
+        return Results(frame, path='', names=self.names, boxes=detections)
+    
+    def _preprocess(self, frame):
+        """
+        Letterbox a frame into the reused input tensor
+        
+        Args:
+            frame: Input BGR frame
+        """
+        height, width = frame.shape[:2]
+        ratio = min(self.imgsz / height, self.imgsz / width)
+        new_width, new_height = round(width * ratio), round(height * ratio)
+        
+        # Center the resized frame on grey padding (same layout as Ultralytics LetterBox)
+        left = round((self.imgsz - new_width) / 2 - 0.1)
+        top = round((self.imgsz - new_height) / 2 - 0.1)
+        
+        self._padded[:] = 114
+        self._padded[top:top + new_height, left:left + new_width] = cv2.resize(
+            frame, (new_width, new_height), interpolation=cv2.INTER_LINEAR
+        )
+        
+        # HWC BGR uint8 -> CHW RGB float32 in [0, 1]
+        np.multiply(
+            self._padded[..., ::-1].transpose(2, 0, 1),
+            1 / 255,
+            out=self._input[0],
+            casting='unsafe'
+        )
@@ -13,6 +13,37 @@ sys.path.append(str(Path(__file__).parent))
 import config
 
 
+# Density levels and the inclusive upper vehicle count of each level but the last
+DENSITY_LABELS = np.array(['LOW', 'MEDIUM', 'HIGH', 'CRITICAL'])
+DENSITY_BOUNDS = np.array([config.DENSITY_THRESHOLDS[level] for level in DENSITY_LABELS[:-1]])
+
+
+def classify_density(vehicle_count):
+    """
+    Classify traffic density based on vehicle count
+    
+    Args:
+        vehicle_count: Number of vehicles
+        
+    Returns:
+        str: Density level (LOW, MEDIUM, HIGH, CRITICAL)
+    """
+    return str(DENSITY_LABELS[np.searchsorted(DENSITY_BOUNDS, vehicle_count)])
+
+
+def classify_density_array(vehicle_counts):
+    """
+    Classify traffic density for many vehicle counts at once
+    
+    Args:
+        vehicle_counts: Array of vehicle counts (e.g. a count time series)
+        
+    Returns:
+        np.ndarray: Density level per count
+    """
+    return DENSITY_LABELS[np.searchsorted(DENSITY_BOUNDS, vehicle_counts)]
+
+
 class TrafficAnalyzer:
     """
     Analyzes traffic density in different zones
@@ -83,9 +114,12 @@ class TrafficAnalyzer:
         # Initialize results
         results = {}
         
+        # Detection centers as one (N, 2) array, shared by all zones
+        centers = np.array([d['center'] for d in detections], dtype=np.float64).reshape(-1, 2)
+        
         for zone_name, polygon in self.zone_polygons.items():
             # Count vehicles in this zone
-            vehicles_in_zone = self._count_vehicles_in_zone(detections, polygon)
+            vehicles_in_zone = self._count_vehicles_in_zone(detections, centers, polygon)
             vehicle_count = len(vehicles_in_zone)
             
             # Classify density level
@@ -106,27 +140,62 @@ class TrafficAnalyzer:
         
         return results
     
-    def _count_vehicles_in_zone(self, detections, polygon):
+    def _count_vehicles_in_zone(self, detections, centers, polygon):
         """
         Count vehicles whose centers are inside the zone polygon
         
         Args:
             detections: List of detections
+            centers: Detection centers as an (N, 2) array
             polygon: Zone polygon (numpy array)
             
         Returns:
             list: Detections that are in this zone
         """
-        vehicles_in_zone = []
+        if len(detections) == 0:
+            return []
+        
+        inside = self._points_in_polygon(centers, polygon)
+        
+        return [detection for detection, is_inside in zip(detections, inside) if is_inside]
+    
+    @staticmethod
+    def _points_in_polygon(points, polygon):
+        """
+        Vectorized point-in-polygon test (crossing number)
+        Points on the boundary count as inside, like cv2.pointPolygonTest(...) >= 0
         
-        for detection in detections:
-            center = detection['center']
+        Args:
+            points: (N, 2) array of points
+            polygon: (K, 2) array of polygon vertices
             
-            # Check if center point is inside polygon
-            if cv2.pointPolygonTest(polygon, center, False) >= 0:
-                vehicles_in_zone.append(detection)
+        Returns:
+            np.array: (N,) boolean mask of points inside the polygon
+        """
+        x = points[:, 0:1]
+        y = points[:, 1:2]
+        
+        # Edges (x1, y1) -> (x2, y2), broadcast against every point
+        x1 = polygon[:, 0].astype(np.float64)
+        y1 = polygon[:, 1].astype(np.float64)
+        x2 = np.roll(x1, -1)
+        y2 = np.roll(y1, -1)
+        
+        # Points lying on an edge
+        cross = (x2 - x1) * (y - y1) - (y2 - y1) * (x - x1)
+        on_edge = (
+            (cross == 0) &
+            (np.minimum(x1, x2) <= x) & (x <= np.maximum(x1, x2)) &
+            (np.minimum(y1, y2) <= y) & (y <= np.maximum(y1, y2))
+        )
+        
+        # Count edges crossed by a ray going right from each point
+        straddles = (y1 > y) != (y2 > y)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_cross = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+        crossings = np.count_nonzero(straddles & (x < x_cross), axis=1)
         
-        return vehicles_in_zone
+        return on_edge.any(axis=1) | (crossings % 2 == 1)
     
     def _classify_density(self, vehicle_count):
         """
@@ -138,14 +207,7 @@ class TrafficAnalyzer:
         Returns:
             str: Density level (LOW, MEDIUM, HIGH, CRITICAL)
         """
-        if vehicle_count <= config.DENSITY_THRESHOLDS['LOW']:
-            return 'LOW'
-        elif vehicle_count <= config.DENSITY_THRESHOLDS['MEDIUM']:
-            return 'MEDIUM'
-        elif vehicle_count <= config.DENSITY_THRESHOLDS['HIGH']:
-            return 'HIGH'
-        else:
-            return 'CRITICAL'
+        return classify_density(vehicle_count)
     
     def get_average_density(self, zone_name, window=10):
         """
@@ -6,8 +6,11 @@ Optimized for CPU-only execution
 import cv2
 import numpy as np
 from ultralytics import YOLO
+from collections import deque
+from functools import lru_cache
 import time
 from pathlib import Path
+import shutil
 import sys
 
 # Add src to path
@@ -15,33 +18,284 @@ sys.path.append(str(Path(__file__).parent))
 import config
 
 
+# Hershey font digits all have the same width, so labels differing only
+# in their digits (IDs, confidences) share a text size
+_DIGITS_TO_ZERO = str.maketrans('123456789', '000000000')
+
+
+# Compact detection record (one row per vehicle, id is -1 when tracking is disabled)
+DET_DTYPE = np.dtype([
+    ('x1', 'i4'), ('y1', 'i4'), ('x2', 'i4'), ('y2', 'i4'),
+    ('cx', 'i4'), ('cy', 'i4'),
+    ('cls', 'i4'), ('conf', 'f4'), ('id', 'i4')
+])
+
+
+def detections_to_dicts(records):
+    """
+    Convert detection records to the list-of-dicts format
+    
+    Args:
+        records: Structured array with DET_DTYPE
+        
+    Returns:
+        list: List of detections, each containing:
+              {'bbox': [x1, y1, x2, y2], 'class': str, 'confidence': float,
+               'class_id': int, 'center': (cx, cy), 'id': int}
+    """
+    detections = []
+    
+    for x1, y1, x2, y2, cx, cy, class_id, confidence, tracking_id in records.tolist():
+        detection = {
+            'bbox': [x1, y1, x2, y2],
+            'class': config.VEHICLE_CLASSES[class_id],
+            'confidence': confidence,
+            'class_id': class_id,
+            'center': (cx, cy)
+        }
+        
+        if tracking_id >= 0:
+            detection['id'] = tracking_id
+        
+        detections.append(detection)
+    
+    return detections
+
+
+def bbox_polygons(detections):
+    """
+    Convert detection boxes to closed polygons for a single cv2.polylines call
+    
+    Args:
+        detections: List of detections or DET_DTYPE records
+        
+    Returns:
+        np.ndarray: (N, 4, 2) int32 corner points
+    """
+    if isinstance(detections, np.ndarray):
+        x1, y1, x2, y2 = (detections[field] for field in ('x1', 'y1', 'x2', 'y2'))
+    else:
+        bboxes = np.array([detection['bbox'] for detection in detections], dtype=np.int32).reshape(-1, 4)
+        x1, y1, x2, y2 = bboxes.T
+    
+    return np.stack((
+        np.column_stack((x1, y1)),
+        np.column_stack((x2, y1)),
+        np.column_stack((x2, y2)),
+        np.column_stack((x1, y2))
+    ), axis=1)
+
+
+VNNI_FLAGS = {'avx512_vnni', 'avx512vnni', 'avx_vnni', 'avxvnni'}
+
+
+@lru_cache(maxsize=None)
+def cpu_supports_vnni():
+    """
+    Check whether the CPU has VNNI instructions (Intel DL Boost)
+    
+    INT8 inference is only faster than FP32 on CPUs with VNNI;
+    without it, quantized models can run slower.
+    Uses py-cpuinfo when installed (any OS), otherwise /proc/cpuinfo.
+    
+    Returns:
+        bool: True if AVX512-VNNI or AVX-VNNI is available
+    """
+    try:
+        import cpuinfo
+        return bool(VNNI_FLAGS & set(cpuinfo.get_cpu_info().get('flags', [])))
+    except ImportError:
+        pass
+    
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                if line.startswith('flags'):
+                    flags = line.split(':', 1)[1].split()
+                    return bool(VNNI_FLAGS & set(flags))
+    except OSError:
+        pass
+    
+    return False
+
+
 class VehicleDetector:
     """
     Detects and tracks vehicles using YOLOv8
     Optimized for CPU performance
     """
     
-    def __init__(self):
-        """Initialize YOLO model and tracking structures"""
-        print(f"[INFO] Initializing YOLOv8 model: {config.YOLO_MODEL}")
-        print(f"[INFO] Device: {config.DEVICE} (CPU-only mode)")
+    def __init__(self, model=None):
+        """
+        Initialize YOLO model and tracking structures
         
-        # Load YOLO model
-        self.model = YOLO(config.YOLO_MODEL)
+        Args:
+            model: Already loaded YOLO model to reuse (loaded from config if None)
+        """
+        if model is None:
+            print(f"[INFO] Initializing YOLOv8 model: {config.YOLO_MODEL}")
+            print(f"[INFO] Device: {config.DEVICE} (CPU-only mode)")
+            
+            # Load YOLO model (exported OpenVINO/ONNX model if configured)
+            model = self._load_model(self._get_model_path())
+            warm_up = config.WARMUP
+        else:
+            warm_up = False  # Reused models are already warm
+        
+        self.model = model
         
         # Force CPU usage
         self.device = config.DEVICE
         
-        # Vehicle tracking
-        self.tracked_vehicles = {}
+        self._vehicle_class_ids = np.array(list(config.VEHICLE_CLASSES), dtype=np.int32)
+        
+        if warm_up:
+            self._warm_up()
+        
+        # Vehicle tracking (one array per track attribute, row i is track i)
+        self._track_ids = np.empty(0, dtype=np.int64)
+        self._track_centers = np.empty((0, 2), dtype=np.int64)
+        self._track_bboxes = np.empty((0, 4), dtype=np.int32)
+        self._track_last_seen = np.empty(0, dtype=np.float64)
         self.next_vehicle_id = 0
+        self._max_dist_sq = config.TRACKING_MAX_DISTANCE * config.TRACKING_MAX_DISTANCE
+        
+        # Track expiry: last-seen timestamps in time order, and how many tracks
+        # currently carry each one (0 once all of them were seen again)
+        self._seen_times = deque()
+        self._tracks_per_seen_time = {}
         
         # Statistics
         self.total_detections = 0
         self.fps = 0
         
+        # Label text sizes keyed by label with digits zeroed
+        self._text_size_cache = {}
+        
         print("[INFO] Vehicle detector initialized successfully")
     
+    def _warm_up(self, runs=3):
+        """
+        Run dummy inferences so the first real frame does not pay
+        for lazy initialization (kernel selection, graph compilation)
+        
+        Args:
+            runs: Number of dummy inferences
+        """
+        dummy = np.zeros((config.IMG_SIZE, config.IMG_SIZE, 3), dtype=np.uint8)
+        
+        for _ in range(runs):
+            self.model.predict(
+                dummy,
+                conf=config.CONFIDENCE_THRESHOLD,
+                imgsz=config.IMG_SIZE,
+                device=self.device,
+                verbose=False,
+                half=False
+            )
+    
+    def _load_model(self, model_path):
+        """
+        Load a model for inference
+        
+        ONNX exports run directly on an ONNX Runtime session;
+        everything else goes through Ultralytics.
+        
+        Args:
+            model_path: Path returned by _get_model_path()
+            
+        Returns:
+            YOLO or ONNXYOLOModel: Model with a predict() method
+        """
+        if model_path.endswith('.onnx'):
+            try:
+                from onnx_model import ONNXYOLOModel
+                return ONNXYOLOModel(model_path)
+            except ImportError:
+                print("[WARNING] onnxruntime not installed (pip install onnxruntime), using Ultralytics ONNX backend")
+        
+        return YOLO(model_path, task='detect')
+    
+    def _get_model_path(self):
+        """
+        Get the model to load for the configured backend,
+        exporting it on first use
+        
+        Returns:
+            str: Path to the PyTorch weights or the exported model
+        """
+        if config.MODEL_FORMAT == 'pytorch':
+            return config.YOLO_MODEL
+        
+        model_path = Path(config.YOLO_MODEL)
+        int8 = config.INT8
+        
+        if int8 == 'auto':
+            # Quantize only where INT8 kernels are actually faster
+            int8 = cpu_supports_vnni()
+            print(f"[INFO] INT8 auto-detect: {'VNNI found, using INT8' if int8 else 'no VNNI, using FP32'}")
+        elif int8 and config.MODEL_FORMAT == 'openvino' and not cpu_supports_vnni():
+            # OpenVINO INT8 kernels are slower than FP32 without VNNI
+            print("[WARNING] CPU has no VNNI support, exporting FP32 OpenVINO model instead of INT8")
+            int8 = False
+        
+        precision = 'int8' if int8 else 'fp32'
+        name = f"{model_path.stem}_{config.IMG_SIZE}_{precision}"
+        
+        if config.MODEL_FORMAT == 'openvino':
+            export_path = model_path.with_name(f"{name}_openvino_model")
+        elif config.MODEL_FORMAT == 'onnx':
+            export_path = model_path.with_name(f"{name}.onnx")
+        else:
+            raise ValueError(f"Unknown MODEL_FORMAT: {config.MODEL_FORMAT}")
+        
+        if not export_path.exists():
+            print(f"[INFO] Exporting {config.YOLO_MODEL} to {config.MODEL_FORMAT} ({precision})...")
+            try:
+                self._export_model(export_path, int8)
+            except Exception as e:
+                print(f"[WARNING] Model export failed ({e}), using PyTorch model")
+                return config.YOLO_MODEL
+        
+        print(f"[INFO] Using exported model: {export_path}")
+        return str(export_path)
+    
+    def _export_model(self, export_path, int8):
+        """
+        Export the PyTorch model to the configured format
+        
+        Args:
+            export_path: Where the exported model should end up
+            int8: Whether to quantize the exported model to INT8
+        """
+        model = YOLO(config.YOLO_MODEL)
+        
+        if config.MODEL_FORMAT == 'openvino':
+            # OpenVINO quantizes with NNCF using the calibration dataset
+            exported = model.export(
+                format='openvino',
+                imgsz=config.IMG_SIZE,
+                half=False,
+                int8=int8,
+                data=config.INT8_CALIBRATION_DATA
+            )
+            shutil.move(str(exported), str(export_path))
+        else:
+            exported = model.export(
+                format='onnx',
+                imgsz=config.IMG_SIZE,
+                opset=17,
+                simplify=True,
+                dynamic=False
+            )
+            
+            if int8:
+                # Dynamic quantization needs no calibration data
+                from onnxruntime.quantization import quantize_dynamic, QuantType
+                quantize_dynamic(str(exported), str(export_path), weight_type=QuantType.QUInt8)
+            else:
+                shutil.move(str(exported), str(export_path))
+    
     def detect_vehicles(self, frame):
         """
         Detect vehicles in a frame
@@ -67,35 +321,7 @@ class VehicleDetector:
         )
         
         # Parse results
-        detections = []
-        
-        if len(results) > 0:
-            result = results[0]
-            boxes = result.boxes
-            
-            for box in boxes:
-                # Get box coordinates
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                confidence = float(box.conf[0])
-                class_id = int(box.cls[0])
-                
-                # Filter only vehicle classes
-                if class_id in config.VEHICLE_CLASSES:
-                    detection = {
-                        'bbox': [int(x1), int(y1), int(x2), int(y2)],
-                        'class': config.VEHICLE_CLASSES[class_id],
-                        'confidence': confidence,
-                        'class_id': class_id,
-                        'center': (int((x1 + x2) / 2), int((y1 + y2) / 2))
-                    }
-                    
-                    # Add tracking ID if enabled
-                    if config.TRACKING_ENABLED:
-                        tracking_id = self._assign_tracking_id(detection)
-                        detection['id'] = tracking_id
-                    
-                    detections.append(detection)
-                    self.total_detections += 1
+        detections = self._parse_result(results[0]) if len(results) > 0 else []
         
         # Calculate FPS
         end_time = time.time()
@@ -103,71 +329,222 @@ class VehicleDetector:
         
         return detections
     
-    def _assign_tracking_id(self, detection):
+    def detect_vehicles_batch(self, frames, scale=1.0):
         """
-        Simple tracking to assign consistent IDs to vehicles
-        Uses center point proximity matching
+        Detect vehicles in several frames with a single batched inference
         
         Args:
-            detection: Detection dictionary
+            frames: List of input images/frames (numpy arrays)
+            scale: Factor mapping frame coordinates back to the original video
+                   resolution (for frames downscaled before detection)
             
         Returns:
-            int: Tracking ID
+            list: One list of detections per frame (same format as detect_vehicles)
         """
-        center = detection['center']
-        bbox = detection['bbox']
-        
-        # Find closest existing track
-        min_distance = float('inf')
-        matched_id = None
-        
-        for vehicle_id, track in list(self.tracked_vehicles.items()):
-            # Calculate distance between centers
-            track_center = track['center']
-            distance = np.sqrt(
-                (center[0] - track_center[0])**2 + 
-                (center[1] - track_center[1])**2
-            )
+        return [detections_to_dicts(records) for records in self.detect_records_batch(frames, scale)]
+    
+    def detect_records_batch(self, frames, scale=1.0):
+        """
+        Detect vehicles in several frames, returning compact detection records
+        
+        Args:
+            frames: List of input images/frames (numpy arrays)
+            scale: Factor mapping frame coordinates back to the original video
+                   resolution (for frames downscaled before detection)
             
-            # Check if within tracking distance
-            if distance < config.TRACKING_MAX_DISTANCE and distance < min_distance:
-                min_distance = distance
-                matched_id = vehicle_id
-        
-        # Update or create track
-        if matched_id is not None:
-            # Update existing track
-            self.tracked_vehicles[matched_id] = {
-                'center': center,
-                'bbox': bbox,
-                'frames_missing': 0,
-                'last_seen': time.time()
-            }
-            return matched_id
+        Returns:
+            list: One DET_DTYPE structured array per frame
+        """
+        if not frames:
+            return []
+        
+        start_time = time.time()
+        
+        # Run YOLO inference on the whole batch (CPU)
+        results = self.model.predict(
+            frames,
+            conf=config.CONFIDENCE_THRESHOLD,
+            iou=config.IOU_THRESHOLD,
+            imgsz=config.IMG_SIZE,
+            device=self.device,
+            verbose=False,
+            half=False  # Disable half precision for CPU
+        )
+        
+        batch_records = [self._parse_records(result, scale) for result in results]
+        
+        # Calculate FPS (frames per second over the batch)
+        end_time = time.time()
+        self.fps = len(frames) / (end_time - start_time) if (end_time - start_time) > 0 else 0
+        
+        return batch_records
+    
+    def _parse_result(self, result, scale=1.0):
+        """
+        Convert a YOLO result into vehicle detections
+        
+        Args:
+            result: Ultralytics result for one frame
+            scale: Factor applied to box coordinates before tracking
+            
+        Returns:
+            list: List of detections
+        """
+        return detections_to_dicts(self._parse_records(result, scale))
+    
+    def _parse_records(self, result, scale=1.0):
+        """
+        Convert a YOLO result into DET_DTYPE detection records
+        
+        Args:
+            result: Ultralytics result for one frame
+            scale: Factor applied to box coordinates before tracking
+            
+        Returns:
+            np.ndarray: Structured array with one row per vehicle
+        """
+        boxes = result.boxes
+        
+        # Move all boxes to NumPy at once instead of per box
+        xyxy = boxes.xyxy.cpu().numpy()
+        confidences = boxes.conf.cpu().numpy()
+        class_ids = boxes.cls.cpu().numpy().astype(np.int32)
+        
+        # Filter only vehicle classes
+        mask = np.isin(class_ids, self._vehicle_class_ids)
+        xyxy = xyxy[mask]
+        confidences = confidences[mask]
+        class_ids = class_ids[mask]
+        
+        if scale != 1.0:
+            xyxy *= scale  # Masked copy, the result tensor is untouched
+        
+        bboxes = xyxy.astype(np.int32)
+        centers = np.column_stack((
+            (xyxy[:, 0] + xyxy[:, 2]) / 2,
+            (xyxy[:, 1] + xyxy[:, 3]) / 2
+        )).astype(np.int64)
+        
+        records = np.empty(len(bboxes), dtype=DET_DTYPE)
+        records['x1'], records['y1'], records['x2'], records['y2'] = bboxes.T
+        records['cx'], records['cy'] = centers.T
+        records['cls'] = class_ids
+        records['conf'] = confidences
+        
+        # Add tracking IDs if enabled
+        if config.TRACKING_ENABLED:
+            records['id'] = self._assign_tracking_ids_batch(centers, bboxes)
         else:
-            # Create new track
-            new_id = self.next_vehicle_id
-            self.next_vehicle_id += 1
-            self.tracked_vehicles[new_id] = {
-                'center': center,
-                'bbox': bbox,
-                'frames_missing': 0,
-                'last_seen': time.time()
-            }
-            return new_id
+            records['id'] = -1
+        
+        self.total_detections += len(records)
+        
+        return records
+    
+    def _assign_tracking_ids_batch(self, centers, bboxes):
+        """
+        Simple tracking to assign consistent IDs to vehicles
+        Matches detections to the nearest free track center, one to one
+        
+        Args:
+            centers: (N, 2) array of detection centers
+            bboxes: (N, 4) array of detection boxes
+            
+        Returns:
+            np.ndarray: (N,) tracking IDs
+        """
+        count = len(centers)
+        ids = np.empty(count, dtype=np.int64)
+        matched = np.zeros(count, dtype=bool)
+        now = time.time()
+        
+        if count and len(self._track_ids):
+            # Squared distances between every detection and every track (N, M)
+            diff = centers[:, None, :] - self._track_centers[None, :, :]
+            dist_sq = (diff * diff).sum(axis=-1)
+            
+            # Greedy one-to-one matching: closest (detection, track) pairs
+            # within tracking distance first, each track used at most once
+            det_index, track_index = np.nonzero(dist_sq < self._max_dist_sq)
+            order = np.argsort(dist_sq[det_index, track_index], kind='stable')
+            nearest = np.full(count, -1, dtype=np.int64)
+            used_tracks = set()
+            for det, track in zip(det_index[order].tolist(), track_index[order].tolist()):
+                if nearest[det] < 0 and track not in used_tracks:
+                    nearest[det] = track
+                    used_tracks.add(track)
+            matched = nearest >= 0
+            
+            # Update existing tracks
+            track_index = nearest[matched]
+            ids[matched] = self._track_ids[track_index]
+            self._track_centers[track_index] = centers[matched]
+            self._track_bboxes[track_index] = bboxes[matched]
+            
+            # Matched tracks no longer carry their previous timestamp
+            seen_times, track_counts = np.unique(self._track_last_seen[track_index], return_counts=True)
+            for seen_time, track_count in zip(seen_times.tolist(), track_counts.tolist()):
+                self._tracks_per_seen_time[seen_time] -= track_count
+            
+            self._track_last_seen[track_index] = now
+            self._record_seen_time(now, len(track_index))
+        
+        # Create new tracks for unmatched detections
+        new = ~matched
+        new_count = int(new.sum())
+        new_ids = np.arange(self.next_vehicle_id, self.next_vehicle_id + new_count, dtype=np.int64)
+        self.next_vehicle_id += new_count
+        ids[new] = new_ids
+        
+        self._track_ids = np.concatenate((self._track_ids, new_ids))
+        self._track_centers = np.concatenate((self._track_centers, centers[new]))
+        self._track_bboxes = np.concatenate((self._track_bboxes, bboxes[new]))
+        self._track_last_seen = np.concatenate((self._track_last_seen, np.full(new_count, now)))
+        self._record_seen_time(now, new_count)
+        
+        return ids
+    
+    def _record_seen_time(self, seen_time, track_count):
+        """
+        Register tracks that were last seen at seen_time
+        
+        Args:
+            seen_time: Timestamp stored in _track_last_seen
+            track_count: Number of tracks given that timestamp
+        """
+        if track_count == 0:
+            return
+        
+        if seen_time not in self._tracks_per_seen_time:
+            self._seen_times.append(seen_time)
+            self._tracks_per_seen_time[seen_time] = 0
+        
+        self._tracks_per_seen_time[seen_time] += track_count
     
     def cleanup_tracks(self):
         """Remove old tracks that haven't been seen recently"""
         current_time = time.time()
-        ids_to_remove = []
         
-        for vehicle_id, track in self.tracked_vehicles.items():
-            # Remove tracks not seen for N frames
-            if current_time - track['last_seen'] > config.TRACKING_MAX_FRAMES_MISSING / 30:  # Assuming ~30 FPS
-                ids_to_remove.append(vehicle_id)
+        # Remove tracks not seen for N frames (assuming ~30 FPS)
+        cutoff = current_time - config.TRACKING_MAX_FRAMES_MISSING / 30
+        
+        # Only the oldest timestamps can have expired; skip the track scan
+        # when none of them is still carried by a track
+        expired = False
+        while self._seen_times and self._seen_times[0] < cutoff:
+            seen_time = self._seen_times.popleft()
+            if self._tracks_per_seen_time.pop(seen_time) > 0:
+                expired = True
         
-        for vehicle_id in ids_to_remove:
-            del self.tracked_vehicles[vehicle_id]
+        if not expired:
+            return
+        
+        keep = self._track_last_seen >= cutoff
+        
+        self._track_ids = self._track_ids[keep]
+        self._track_centers = self._track_centers[keep]
+        self._track_bboxes = self._track_bboxes[keep]
+        self._track_last_seen = self._track_last_seen[keep]
     
     def get_stats(self):
         """
@@ -179,9 +556,28 @@ class VehicleDetector:
         return {
             'fps': round(self.fps, 2),
             'total_detections': self.total_detections,
-            'active_tracks': len(self.tracked_vehicles)
+            'active_tracks': len(self._track_ids)
         }
     
+    def _get_text_size(self, label):
+        """
+        Get the drawn size of a label, measuring each label shape only once
+        
+        Args:
+            label: Label text
+            
+        Returns:
+            tuple: (text_width, text_height)
+        """
+        key = label.translate(_DIGITS_TO_ZERO)
+        size = self._text_size_cache.get(key)
+        
+        if size is None:
+            size, _ = cv2.getTextSize(key, config.FONT, config.FONT_SCALE, config.FONT_THICKNESS)
+            self._text_size_cache[key] = size
+        
+        return size
+    
     def draw_detections(self, frame, detections, show_labels=True):
         """
         Draw detection boxes and labels on frame
@@ -194,31 +590,26 @@ class VehicleDetector:
         Returns:
             frame: Frame with drawn detections
         """
-        for detection in detections:
-            bbox = detection['bbox']
-            vehicle_class = detection['class']
-            confidence = detection['confidence']
-            
-            # Draw bounding box
-            color = config.COLORS['GREEN']
-            cv2.rectangle(
-                frame,
-                (bbox[0], bbox[1]),
-                (bbox[2], bbox[3]),
-                color,
-                config.LINE_THICKNESS
-            )
-            
-            # Draw label
-            if show_labels:
+        if not detections:
+            return frame
+        
+        # Draw all bounding boxes in one call
+        color = config.COLORS['GREEN']
+        cv2.polylines(frame, bbox_polygons(detections), True, color, config.LINE_THICKNESS)
+        
+        # Draw labels
+        if show_labels:
+            for detection in detections:
+                bbox = detection['bbox']
+                vehicle_class = detection['class']
+                confidence = detection['confidence']
+                
                 label = f"{vehicle_class}: {confidence:.2f}"
                 if 'id' in detection:
                     label = f"ID{detection['id']} {label}"
                 
                 # Background for text
-                (text_width, text_height), _ = cv2.getTextSize(
-                    label, config.FONT, config.FONT_SCALE, config.FONT_THICKNESS
-                )
+                text_width, text_height = self._get_text_size(label)
                 cv2.rectangle(
                     frame,
                     (bbox[0], bbox[1] - text_height - 10),
@@ -0,0 +1,256 @@
+"""
+Video Capture Module
+Opens video sources with optional hardware-accelerated decoding
+"""
+
+import cv2
+import numpy as np
+import os
+from pathlib import Path
+import sys
+import threading
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent))
+import config
+
+
+# OPENCV_FFMPEG_CAPTURE_OPTIONS is process-wide; direction videos are opened
+# from parallel threads, so setting it, opening and restoring it must not interleave
+_ffmpeg_options_lock = threading.Lock()
+
+
+def open_video_capture(video_source, decode_max_side=None):
+    """
+    Open a video source, using GPU decoding when enabled in config
+    
+    Without USE_GPU_DECODE, files and streams still request FFmpeg's
+    hardware acceleration (VA-API, QSV, D3D11) when USE_HW_DECODE is set;
+    OpenCV decodes in software where none is available. Falls back to the
+    default CPU decoder if the source cannot be opened that way.
+    
+    Args:
+        video_source: Video file path or camera index
+        decode_max_side: Optional size for the longer frame side when the
+                         decoder can resize (only honoured by the 'ffmpegcv'
+                         backend); the aspect ratio is kept
+    
+    Returns:
+        cv2.VideoCapture: Opened (or unopened, on failure) capture object
+    """
+    # Camera indices do not go through FFmpeg, so only files/streams can be accelerated
+    if config.USE_GPU_DECODE and not isinstance(video_source, int):
+        if config.GPU_DECODE_BACKEND == 'ffmpegcv':
+            cap = _open_ffmpegcv_capture(video_source, decode_max_side)
+            if cap is not None:
+                return cap
+        else:
+            cap = _open_gpu_capture(video_source, config.GPU_DECODE_OPTIONS)
+            if cap is not None:
+                return _limit_buffering(cap)
+        print("[WARNING] GPU decoding unavailable, falling back to CPU decoding")
+    
+    cap = None
+    if config.USE_HW_DECODE and not isinstance(video_source, int):
+        cap = _open_gpu_capture(video_source)
+    
+    if cap is None:
+        cap = cv2.VideoCapture(video_source)
+    
+    return _limit_buffering(cap)
+
+
+def _limit_buffering(cap):
+    """
+    Keep only the newest frame buffered in the capture
+    Reduces latency on live sources; ignored by backends without buffering
+    
+    Args:
+        cap: cv2.VideoCapture
+    
+    Returns:
+        cv2.VideoCapture: The same capture
+    """
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    return cap
+
+
+def _open_gpu_capture(video_source, ffmpeg_options=None):
+    """
+    Try to open a video source with FFmpeg hardware decoding
+    
+    Args:
+        video_source: Video file path or stream URL
+        ffmpeg_options: Optional OPENCV_FFMPEG_CAPTURE_OPTIONS value
+                        (e.g. to force the NVDEC decoder)
+    
+    Returns:
+        cv2.VideoCapture or None: Opened capture, or None if unavailable
+    """
+    with _ffmpeg_options_lock:
+        # FFmpeg reads the capture options when the capture is opened
+        previous_options = os.environ.get('OPENCV_FFMPEG_CAPTURE_OPTIONS')
+        if ffmpeg_options:
+            os.environ['OPENCV_FFMPEG_CAPTURE_OPTIONS'] = ffmpeg_options
+        
+        try:
+            cap = cv2.VideoCapture(
+                video_source,
+                cv2.CAP_FFMPEG,
+                [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY]
+            )
+        except (cv2.error, AttributeError):
+            # AttributeError: OpenCV build without hardware acceleration properties
+            return None
+        finally:
+            # Restore whatever the user had configured
+            if ffmpeg_options:
+                if previous_options is None:
+                    os.environ.pop('OPENCV_FFMPEG_CAPTURE_OPTIONS', None)
+                else:
+                    os.environ['OPENCV_FFMPEG_CAPTURE_OPTIONS'] = previous_options
+    
+    if not cap.isOpened():
+        cap.release()
+        return None
+    
+    return cap
+
+
+def _open_ffmpegcv_capture(video_source, decode_max_side=None):
+    """
+    Try to open a video source with ffmpegcv's NVDEC reader
+    
+    Decoding and resizing both run on the GPU, so frames arrive
+    downscaled without a host-side cv2.resize.
+    
+    Args:
+        video_source: Video file path or stream URL
+        decode_max_side: Optional size for the longer frame side
+    
+    Returns:
+        FFmpegCVCapture or None: Opened capture, or None if unavailable
+    """
+    try:
+        import ffmpegcv
+    except ImportError:
+        print("[WARNING] ffmpegcv not installed (pip install ffmpegcv)")
+        return None
+    
+    try:
+        reader = ffmpegcv.VideoCaptureNV(video_source, pix_fmt='bgr24')
+        
+        # The source size is only known once opened; reopen with a resize
+        # that keeps the aspect ratio so frames and zones are not distorted
+        decode_size = _fit_size(reader.width, reader.height, decode_max_side)
+        if decode_size is not None:
+            reader.release()
+            reader = ffmpegcv.VideoCaptureNV(video_source, pix_fmt='bgr24', resize=decode_size)
+    except Exception as e:
+        print(f"[WARNING] ffmpegcv NVDEC reader failed: {e}")
+        return None
+    
+    return FFmpegCVCapture(reader)
+
+
+def _fit_size(width, height, max_side):
+    """
+    Scale a frame size down so its longer side is max_side
+    
+    Args:
+        width: Source frame width
+        height: Source frame height
+        max_side: Target size for the longer side, or None
+    
+    Returns:
+        tuple or None: (width, height) to resize to, or None to keep the source size
+    """
+    if not max_side or max(width, height) <= max_side:
+        return None
+    
+    scale = max(width, height) / max_side
+    # NVDEC scaling works on even dimensions (4:2:0 chroma)
+    return (
+        max(2, 2 * round(width / scale / 2)),
+        max(2, 2 * round(height / scale / 2))
+    )
+
+
+class FFmpegCVCapture:
+    """
+    Adapts an ffmpegcv reader to the cv2.VideoCapture interface
+    used by the rest of the system
+    """
+    
+    def __init__(self, reader):
+        """
+        Args:
+            reader: Opened ffmpegcv video reader
+        """
+        self.reader = reader
+        self._frame = None
+        self._opened = True
+    
+    def isOpened(self):
+        """Check whether the reader is still open"""
+        return self._opened
+    
+    def grab(self):
+        """Decode the next frame and keep it for retrieve()"""
+        ret, self._frame = self.reader.read()
+        return ret
+    
+    def retrieve(self, image=None):
+        """Return the frame decoded by the last grab()"""
+        if self._frame is None:
+            return False, None
+        return True, self._writable(self._frame, image)
+    
+    def read(self, image=None):
+        """Decode and return the next frame"""
+        ret, frame = self.reader.read()
+        if not ret or frame is None:
+            return False, frame
+        return True, self._writable(frame, image)
+    
+    @staticmethod
+    def _writable(frame, image=None):
+        """
+        Make sure a frame can be drawn on in place
+        
+        ffmpegcv returns read-only views of its pipe buffer; those are
+        copied, into image when it has a matching shape.
+        
+        Args:
+            frame: Frame from the ffmpegcv reader
+            image: Optional preallocated buffer (cv2.VideoCapture.read style)
+        
+        Returns:
+            np.ndarray: Writable frame
+        """
+        if frame.flags.writeable:
+            return frame
+        
+        if image is not None and image.shape == frame.shape and image.dtype == frame.dtype:
+            np.copyto(image, frame)
+            return image
+        
+        return frame.copy()
+    
+    def get(self, prop_id):
+        """Get a capture property (size, FPS and frame count only)"""
+        if prop_id == cv2.CAP_PROP_FRAME_WIDTH:
+            return self.reader.width
+        if prop_id == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self.reader.height
+        if prop_id == cv2.CAP_PROP_FPS:
+            return self.reader.fps
+        if prop_id == cv2.CAP_PROP_FRAME_COUNT:
+            return self.reader.count
+        return 0
+    
+    def release(self):
+        """Close the reader"""
+        if self._opened:
+            self.reader.release()
+            self._opened = False
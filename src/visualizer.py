@@ -34,6 +34,15 @@ class TrafficVisualizer:
         self.video_height = self.display_height
         self.panel_width = self.display_width - self.video_width
         
+        # Zone overlay buffer, reused across frames of the same size
+        self._overlay = None
+        
+        # Pixel zone polygons per frame size (zones are constant)
+        self._zone_polygons = {}
+        
+        # Output frame buffer, reused for every create_frame() call
+        self._display_frame = np.zeros((self.display_height, self.display_width, 3), dtype=np.uint8)
+        
         print("[INFO] Traffic visualizer initialized")
     
     def create_frame(self, video_frame, detections, traffic_analysis, signal_status, stats):
@@ -41,29 +50,33 @@ class TrafficVisualizer:
         Create complete visualization frame
         
         Args:
-            video_frame: Original video frame
+            video_frame: Original video frame (numpy array or cv2.UMat)
             detections: Vehicle detections from detector
             traffic_analysis: Traffic analysis results
             signal_status: Signal controller status
             stats: System statistics
             
         Returns:
-            np.array: Visualization frame
+            np.array: Visualization frame (reused buffer, overwritten on the next call)
         """
-        # Resize video frame
+        # Resize video frame (runs on OpenCL when given a UMat)
         video_display = cv2.resize(video_frame, (self.video_width, self.video_height))
+        if isinstance(video_display, cv2.UMat):
+            video_display = video_display.get()
         
         # Create info panel
         info_panel = self._create_info_panel(traffic_analysis, signal_status, stats)
         
         # Combine video and panel
-        display_frame = np.hstack([video_display, info_panel])
+        self._display_frame[:, :self.video_width] = video_display
+        self._display_frame[:, self.video_width:] = info_panel
         
-        return display_frame
+        return self._display_frame
     
     def draw_detections_and_zones(self, frame, detections, traffic_analysis):
         """
         Draw vehicle detections and traffic zones on frame
+        The frame is drawn on in place
         
         Args:
             frame: Input frame
@@ -74,19 +87,19 @@ class TrafficVisualizer:
             frame: Frame with overlays
         """
         # Draw detection zones first (semi-transparent)
-        overlay = frame.copy()
+        if self._overlay is None or self._overlay.shape != frame.shape:
+            self._overlay = np.empty_like(frame)
+        overlay = self._overlay
+        np.copyto(overlay, frame)
+        
+        zone_polygons = self._get_zone_polygons(frame.shape[:2])
         
         for zone_name, polygon in traffic_analysis.items():
             if 'color' in traffic_analysis[zone_name]:
                 color = traffic_analysis[zone_name]['color']
                 
-                # Get zone polygon from config (need to scale to frame size)
-                h, w = frame.shape[:2]
-                normalized_coords = config.DETECTION_ZONES[zone_name]
-                pixel_coords = []
-                for x, y in normalized_coords:
-                    pixel_coords.append([int(x * w), int(y * h)])
-                polygon_pts = np.array(pixel_coords, dtype=np.int32)
+                # Zone polygon scaled to frame size
+                polygon_pts = zone_polygons[zone_name]
                 
                 # Draw filled polygon
                 cv2.fillPoly(overlay, [polygon_pts], color)
@@ -118,7 +131,7 @@ class TrafficVisualizer:
         
         # Blend overlay
         alpha = 0.25
-        frame = cv2.addWeighted(overlay, alpha, frame, 1 - alpha, 0)
+        frame = cv2.addWeighted(overlay, alpha, frame, 1 - alpha, 0, dst=frame)
         
         # Draw vehicle bounding boxes
         for detection in detections:
@@ -149,6 +162,29 @@ class TrafficVisualizer:
         
         return frame
     
+    def _get_zone_polygons(self, frame_shape):
+        """
+        Get detection zones in pixel coordinates for a frame size
+        
+        Args:
+            frame_shape: Tuple of (height, width)
+            
+        Returns:
+            dict: Zone name -> polygon (numpy int32 array)
+        """
+        polygons = self._zone_polygons.get(frame_shape)
+        
+        if polygons is None:
+            h, w = frame_shape
+            scale = np.array([w, h], dtype=np.float64)
+            polygons = {
+                zone_name: (np.array(coords) * scale).astype(np.int32)
+                for zone_name, coords in config.DETECTION_ZONES.items()
+            }
+            self._zone_polygons[frame_shape] = polygons
+        
+        return polygons
+    
     def _create_info_panel(self, traffic_analysis, signal_status, stats):
         """
         Create information panel showing signals and stats
@@ -7,28 +7,79 @@ import cv2
 import numpy as np
 from pathlib import Path
 import json
+import os
+import queue
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import ExitStack, contextmanager
 from typing import Dict, List, Tuple
 
 # Add src to path
 src_path = Path(__file__).parent / 'src'
 sys.path.append(str(src_path))
 
-from vehicle_detector import VehicleDetector
-from traffic_analyzer import TrafficAnalyzer
+from vehicle_detector import VehicleDetector, DET_DTYPE, bbox_polygons, detections_to_dicts
+from traffic_analyzer import classify_density
 from signal_controller import TrafficSignalController
+from video_capture import open_video_capture
 import config
 
 
+class ModelPool:
+    """
+    Keeps loaded YOLO models for reuse across requests
+    Ultralytics models are not safe to share between threads, so each
+    processor checks out a model for exclusive use and returns it afterwards
+    """
+    
+    def __init__(self):
+        """Initialize an empty pool"""
+        self._models = queue.SimpleQueue()
+    
+    def preload(self, count: int = 1):
+        """
+        Load models ahead of the first request
+        
+        Args:
+            count: Number of models to load
+        """
+        for _ in range(count):
+            self._models.put(VehicleDetector().model)
+    
+    @contextmanager
+    def processor(self):
+        """
+        Create a WebTrafficProcessor backed by a pooled model
+        
+        Yields:
+            WebTrafficProcessor: Processor with fresh tracking/signal state
+        """
+        try:
+            model = self._models.get_nowait()
+        except queue.Empty:
+            model = None  # Pool exhausted, the detector loads a new model
+        
+        processor = WebTrafficProcessor(model=model)
+        try:
+            yield processor
+        finally:
+            self._models.put(processor.detector.model)
+
+
 class WebTrafficProcessor:
     """
     Processes traffic data from uploaded videos/images for web interface
     """
     
-    def __init__(self):
-        """Initialize processing components"""
-        self.detector = VehicleDetector()
-        self.analyzer = None  # Will be initialized when we know frame size
+    def __init__(self, model=None):
+        """
+        Initialize processing components
+        
+        Args:
+            model: Already loaded YOLO model to reuse (loaded from config if None)
+        """
+        self.detector = VehicleDetector(model=model)
         self.controller = TrafficSignalController()
         
     def process_direction_video(self, video_path: str, direction: str, max_frames: int = 100) -> Dict:
@@ -43,7 +94,7 @@ class WebTrafficProcessor:
         Returns:
             dict: Processing results including vehicle counts, density, and annotated frames
         """
-        cap = cv2.VideoCapture(video_path)
+        cap = open_video_capture(video_path)
         
         if not cap.isOpened():
             raise ValueError(f"Cannot open video: {video_path}")
@@ -53,48 +104,101 @@ class WebTrafficProcessor:
         frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
         
-        # Initialize analyzer with frame shape
-        if self.analyzer is None:
-            self.analyzer = TrafficAnalyzer((frame_height, frame_width))
-        
         # Process frames
-        all_detections = []
-        vehicle_counts = []
-        frame_count = 0
+        count_sum = 0  # Running vehicle count statistics over processed frames (also the detection total)
+        count_max = 0
+        count_frames = 0
         sample_frames = []
         
         # Calculate frame skip for better performance
         frame_skip = max(1, total_frames // max_frames)
         
-        while frame_count < max_frames:
-            ret, frame = cap.read()
+        # Downscale frames to the model input size once, instead of inside the predictor;
+        # detections are scaled back to the original resolution
+        scale = max(frame_width, frame_height) / config.IMG_SIZE
+        if scale > 1:
+            detect_size = (round(frame_width / scale), round(frame_height / scale))
+        else:
+            scale, detect_size = 1.0, None
+        
+        # Sampled (frame index, frame, detection frame, reuse previous detections) entries
+        # waiting for detection
+        batch = []
+        prev_gray = None  # Downscaled grayscale of the last frame sent to the detector
+        prev_detections = np.empty(0, dtype=DET_DTYPE)
+        
+        def detect_batch():
+            """Detect vehicles in the pending frames with one batched inference"""
+            nonlocal prev_detections, count_sum, count_max, count_frames
             
-            if not ret:
-                break
+            frames = [small for _, _, small, reuse in batch if not reuse]
+            batch_detections = iter(self.detector.detect_records_batch(frames, scale))
             
-            # Skip frames for performance
-            if frame_count % frame_skip != 0:
-                frame_count += 1
-                continue
+            for index, frame, _, reuse in batch:
+                if not reuse:
+                    prev_detections = next(batch_detections)
+                detections = prev_detections
+                
+                vehicle_count = len(detections)
+                count_sum += vehicle_count
+                count_max = max(count_max, vehicle_count)
+                count_frames += 1
+                
+                # Save sample frames (first, middle)
+                if index == 0 or index == max_frames // 2:
+                    # Draw detections
+                    annotated_frame = self._draw_detections(frame.copy(), detections_to_dicts(detections))
+                    sample_frames.append(annotated_frame)
             
-            # Detect vehicles
-            detections = self.detector.detect_vehicles(frame)
-            all_detections.extend(detections)
-            vehicle_counts.append(len(detections))
-            
-            # Save sample frames (first, middle, last)
-            if frame_count == 0 or frame_count == max_frames // 2 or not ret:
-                # Draw detections
-                annotated_frame = self._draw_detections(frame.copy(), detections)
-                sample_frames.append(annotated_frame)
+            batch.clear()
+        
+        # Decode on a separate thread so decoding overlaps with detection
+        frame_queue = queue.Queue(maxsize=config.PIPELINE_QUEUE_SIZE)
+        stop_reading = threading.Event()
+        reader = threading.Thread(
+            target=self._read_frames,
+            args=(cap, frame_skip, max_frames, detect_size, frame_queue, stop_reading),
+            daemon=True
+        )
+        reader.start()
+        
+        try:
+            while True:
+                frame_index, frame, small = frame_queue.get()
+                
+                if frame is None:
+                    if small is not None:
+                        raise small  # The reader thread failed, small holds its exception
+                    frame_count = frame_index  # End of video: number of frames read
+                    break
+                
+                # Reuse the previous detections when the scene has barely changed
+                small_gray = cv2.cvtColor(
+                    cv2.resize(small, config.FRAME_DIFF_SIZE, interpolation=cv2.INTER_AREA),
+                    cv2.COLOR_BGR2GRAY
+                )
+                reuse = (
+                    prev_gray is not None
+                    and cv2.absdiff(small_gray, prev_gray).mean() < config.FRAME_DIFF_THRESHOLD
+                )
+                if not reuse:
+                    prev_gray = small_gray
+                
+                batch.append((frame_index, frame, small, reuse))
+                
+                if len(batch) >= config.BATCH_SIZE:
+                    detect_batch()
             
-            frame_count += 1
-        
-        cap.release()
+            if batch:
+                detect_batch()
+        finally:
+            stop_reading.set()
+            reader.join()
+            cap.release()
         
         # Calculate statistics
-        avg_vehicles = np.mean(vehicle_counts) if vehicle_counts else 0
-        max_vehicles = max(vehicle_counts) if vehicle_counts else 0
+        avg_vehicles = count_sum / count_frames if count_frames else 0
+        max_vehicles = count_max
         
         # Classify density based on average
         density = self._classify_density(int(avg_vehicles))
@@ -106,9 +210,149 @@ class WebTrafficProcessor:
             'max_vehicles': int(max_vehicles),
             'density_level': density,
             'sample_frames': sample_frames,
-            'all_detections': len(all_detections)
+            'all_detections': count_sum
         }
     
+    def process_all_directions(self, videos: Dict[str, str], max_frames: int = 100,
+                               pool: ModelPool = None, max_workers: int = None) -> Dict[str, Dict]:
+        """
+        Process videos for all directions in parallel
+        
+        OpenCV decoding and YOLO inference release the GIL, so directions run
+        concurrently on threads. YOLO models and trackers are not thread-safe:
+        this processor handles the first direction and every other direction
+        gets its own processor backed by a model from the pool.
+        
+        Args:
+            videos: Dictionary mapping direction names to video paths
+            max_frames: Maximum frames to process per video
+            pool: ModelPool to borrow models from (new models are loaded if None)
+            max_workers: Maximum directions processed at once
+            
+        Returns:
+            dict: Dictionary mapping direction names to their results
+                  (same format as process_direction_video, in upload order)
+        """
+        if pool is None:
+            pool = ModelPool()
+        if max_workers is None:
+            max_workers = min(4, max(1, (os.cpu_count() or 1) // 2))
+        
+        directions = list(videos.keys())
+        completed = {}
+        
+        with ExitStack() as pooled:
+            processors = {directions[0]: self} if directions else {}
+            for direction in directions[1:]:
+                processors[direction] = pooled.enter_context(pool.processor())
+            
+            with ThreadPoolExecutor(max_workers=max(1, min(len(directions), max_workers))) as executor:
+                futures = {
+                    executor.submit(processors[direction].process_direction_video,
+                                    videos[direction], direction, max_frames): direction
+                    for direction in directions
+                }
+                
+                for future in as_completed(futures):
+                    completed[futures[future]] = future.result()
+        
+        # Keep upload order so the signal sequence is deterministic
+        return {direction: completed[direction] for direction in directions}
+    
+    def _read_frames(self, cap, frame_skip: int, max_frames: int, detect_size,
+                     frame_queue: queue.Queue, stop: threading.Event):
+        """
+        Decode the sampled video frames ahead of detection (runs on a reader thread)
+        
+        Args:
+            cap: Opened video capture
+            frame_skip: Only every Nth frame is decoded
+            max_frames: Maximum frames to read
+            detect_size: (width, height) to downscale frames to for detection,
+                         or None to detect on the original frames
+            frame_queue: Queue receiving (frame index, frame, detection frame) items,
+                         then (frames read, None, None) at the end of the video,
+                         or (frames read, None, exception) if reading failed
+            stop: Set by the consumer to stop reading early
+        """
+        frame_count = 0
+        error = None
+        
+        # Decode into a ring of preallocated buffers instead of a new array per frame;
+        # it has a slot for every frame that can still be queued or waiting in a batch
+        ring_size = config.PIPELINE_QUEUE_SIZE + config.BATCH_SIZE + 2
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        frame_buffers = [np.empty((height, width, 3), dtype=np.uint8) for _ in range(ring_size)]
+        if detect_size is not None:
+            small_buffers = [
+                np.empty((detect_size[1], detect_size[0], 3), dtype=np.uint8) for _ in range(ring_size)
+            ]
+        else:
+            small_buffers = [None] * ring_size
+        slot = 0
+        
+        try:
+            while frame_count < max_frames and not stop.is_set():
+                # Grab frame (advances the stream without decoding)
+                if not cap.grab():
+                    break
+                
+                # Decode only the frames we actually process
+                if frame_count % frame_skip == 0:
+                    ret, frame = cap.retrieve(frame_buffers[slot])
+                    
+                    if not ret:
+                        break
+                    
+                    item = self._frame_item(frame_count, frame, detect_size, small_buffers[slot])
+                    if not self._put_frame(frame_queue, item, stop):
+                        break
+                    
+                    slot = (slot + 1) % ring_size
+                
+                frame_count += 1
+        except Exception as e:
+            error = e  # Re-raised on the consumer thread
+        finally:
+            self._put_frame(frame_queue, (frame_count, None, error), stop)
+    
+    @staticmethod
+    def _frame_item(frame_index: int, frame, detect_size, small_buffer) -> Tuple:
+        """
+        Build a frame queue item, downscaling the frame for detection if needed
+        
+        Args:
+            frame_index: Index of the frame in the video
+            frame: Decoded frame
+            detect_size: (width, height) for detection, or None to use the frame as is
+            small_buffer: Preallocated buffer receiving the downscaled frame
+        
+        Returns:
+            tuple: (frame index, original frame, detection frame)
+        """
+        if detect_size is None:
+            return frame_index, frame, frame
+        
+        small = cv2.resize(frame, detect_size, dst=small_buffer, interpolation=cv2.INTER_LINEAR)
+        return frame_index, frame, small
+    
+    @staticmethod
+    def _put_frame(frame_queue: queue.Queue, item: Tuple, stop: threading.Event) -> bool:
+        """
+        Put an item on the frame queue, giving up once reading is stopped
+        
+        Returns:
+            bool: True if the item was queued
+        """
+        while not stop.is_set():
+            try:
+                frame_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
     def process_direction_image(self, image_path: str, direction: str) -> Dict:
         """
         Process image for a single direction
@@ -120,18 +364,64 @@ class WebTrafficProcessor:
         Returns:
             dict: Processing results
         """
-        # Read image
+        frame = self._read_image(image_path)
+        
+        # Detect vehicles
+        detections = self.detector.detect_vehicles(frame)
+        
+        return self._build_image_result(direction, frame, detections)
+    
+    def process_directions_batch(self, image_paths: Dict[str, str]) -> Dict[str, Dict]:
+        """
+        Process images for several directions with one batched inference
+        
+        Args:
+            image_paths: Dictionary mapping direction names to image paths
+            
+        Returns:
+            dict: Dictionary mapping direction names to their results
+                  (same format as process_direction_image)
+        """
+        directions = list(image_paths.keys())
+        frames = [self._read_image(image_paths[direction]) for direction in directions]
+        
+        # Detect vehicles in all images at once
+        batch_detections = self.detector.detect_vehicles_batch(frames)
+        
+        return {
+            direction: self._build_image_result(direction, frame, detections)
+            for direction, frame, detections in zip(directions, frames, batch_detections)
+        }
+    
+    def _read_image(self, image_path: str):
+        """
+        Read an image from disk
+        
+        Args:
+            image_path: Path to image file
+            
+        Returns:
+            np.array: Image frame
+        """
         frame = cv2.imread(image_path)
         
         if frame is None:
             raise ValueError(f"Cannot read image: {image_path}")
         
-        # Initialize analyzer with frame shape
-        if self.analyzer is None:
-            self.analyzer = TrafficAnalyzer(frame.shape[:2])
+        return frame
+    
+    def _build_image_result(self, direction: str, frame, detections: List[Dict]) -> Dict:
+        """
+        Build the result for a processed direction image
         
-        # Detect vehicles
-        detections = self.detector.detect_vehicles(frame)
+        Args:
+            direction: Direction name (NORTH, SOUTH, EAST, WEST)
+            frame: Image frame
+            detections: Detections for the frame
+            
+        Returns:
+            dict: Processing results
+        """
         vehicle_count = len(detections)
         
         # Draw detections
@@ -254,14 +544,7 @@ class WebTrafficProcessor:
         Returns:
             str: Density level (LOW, MEDIUM, HIGH, CRITICAL)
         """
-        if vehicle_count <= 5:
-            return 'LOW'
-        elif vehicle_count <= 15:
-            return 'MEDIUM'
-        elif vehicle_count <= 25:
-            return 'HIGH'
-        else:
-            return 'CRITICAL'
+        return classify_density(vehicle_count)
     
     def _draw_detections(self, frame, detections):
         """
@@ -274,21 +557,18 @@ class WebTrafficProcessor:
         Returns:
             frame: Annotated frame
         """
+        if not detections:
+            return frame
+        
+        # Draw all bounding boxes in one call
+        color = (0, 255, 0)  # Green
+        cv2.polylines(frame, bbox_polygons(detections), True, color, 2)
+        
         for detection in detections:
             bbox = detection['bbox']
             vehicle_class = detection['class']
             confidence = detection['confidence']
             
-            # Draw bounding box
-            color = (0, 255, 0)  # Green
-            cv2.rectangle(
-                frame,
-                (bbox[0], bbox[1]),
-                (bbox[2], bbox[3]),
-                color,
-                2
-            )
-            
             # Draw label
             label = f"{vehicle_class}: {confidence:.2f}"
             cv2.putText(
@@ -311,4 +591,10 @@ class WebTrafficProcessor:
             frame: Frame to save
             output_path: Output file path
         """
-        cv2.imwrite(output_path, frame)
+        ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, config.JPEG_QUALITY])
+        
+        if not ok:
+            raise ValueError(f"Cannot encode frame for: {output_path}")
+        
+        with open(output_path, 'wb') as f:
+            f.write(buffer.tobytes())